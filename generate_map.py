@@ -10,20 +10,32 @@ import re
 import csv
 import time
 import json
-from dataclasses import dataclass, asdict, replace
-from datetime import datetime
-from urllib.parse import urlparse, urljoin, parse_qs
+import asyncio
+import sqlite3
+import functools
+import operator
+import threading
+from collections import defaultdict
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse, urljoin, parse_qs, urlencode
 from urllib import robotparser
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
+from lxml import html as lxml_html
+from lxml.cssselect import CSSSelector
 
-from geopy.geocoders import Nominatim
-from geopy.extra.rate_limiter import RateLimiter
-from geopy.distance import geodesic
+import aiohttp
+import numpy as np
 
 import folium
-from folium.plugins import MarkerCluster, Fullscreen, LocateControl, MousePosition
+from folium.plugins import FastMarkerCluster, Fullscreen, LocateControl, MousePosition
 from branca.element import MacroElement, Template
 
 
@@ -42,8 +54,13 @@ SLEEP_SEC_BETWEEN_SITES = 2.0
 TIMEOUT = 25
 USER_AGENT = "Mozilla/5.0 (compatible; ImmoWatchSnapshot/1.3)"
 
-SLEEP_SEC_BETWEEN_DETAIL_PAGES = 0.6
+SLEEP_SEC_BETWEEN_DETAIL_PAGES = 0.2
+DETAIL_MAX_PER_HOST = 4
 SLEEP_SEC_BETWEEN_GEOCODE = 1.1
+NOMINATIM_URL = "https://nominatim.openstreetmap.org"
+NOMINATIM_USER_AGENT = "bungalow_mapper/1.3"
+NOMINATIM_MAX_RETRIES = 4
+NOMINATIM_HTTP_CACHE_TTL_SEC = 30 * 24 * 3600
 
 SLEEP_SEC_BETWEEN_IMMOWEB_DETAIL = 0.8
 SLEEP_SEC_BETWEEN_FUNDA_DETAIL = 0.8
@@ -55,8 +72,7 @@ RADIUS_KM = 40
 OUT_SNAPSHOT_CSV = r"bungalows_snapshot.csv"
 OUT_NEW_CSV = r"bungalows_new.csv"
 OUT_MAP_HTML = r"bungalows_map.html"
-GEO_CACHE_JSON = r"geo_cache.json"
-REV_CACHE_JSON = r"reverse_cache.json"
+GEO_CACHE_DB = r"geo.db"
 
 COLUMNS = [
     "scraped_at", "source", "title", "price_text", "location_text", "since_text", "url",
@@ -66,7 +82,7 @@ COLUMNS = [
 
 # --------------- MODEL ---------------
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Row:
     scraped_at: str
     source: str
@@ -81,18 +97,38 @@ class Row:
     distance_km: float | None = None
 
 
+ROW_FIELDS = operator.attrgetter(*COLUMNS)
+
+
 # --------------- HELPERS ---------------
 
-def robots_allows(url: str) -> bool:
-    parsed = urlparse(url)
-    robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
-    rp = robotparser.RobotFileParser()
+@functools.lru_cache(maxsize=64)
+def _robots_for(scheme_netloc: tuple[str, str]) -> robotparser.RobotFileParser | None:
+    scheme, netloc = scheme_netloc
+    rp = robotparser.RobotFileParser(f"{scheme}://{netloc}/robots.txt")
     try:
-        rp.set_url(robots_url)
-        rp.read()
-        return rp.can_fetch(USER_AGENT, url)
+        r = SESSION.get(rp.url, timeout=10, verify=False)
+    except requests.exceptions.RetryError:
+        # Persistent 5xx: left unread, so can_fetch() refuses
+        return rp
     except Exception:
+        return None
+    # Same status handling as RobotFileParser.read(): 401/403 disallow everything,
+    # other 4xx allow everything, 5xx leaves the parser unread so can_fetch() refuses
+    if r.status_code in (401, 403):
+        rp.disallow_all = True
+    elif 400 <= r.status_code < 500:
+        rp.allow_all = True
+    elif r.status_code < 400:
+        rp.parse(r.text.splitlines())
+    return rp
+
+def robots_allows(url: str) -> bool:
+    parsed = urlparse(url)
+    rp = _robots_for((parsed.scheme, parsed.netloc))
+    if rp is None:
         return True
+    return rp.can_fetch(USER_AGENT, url)
 
 def norm(s: str) -> str:
     return re.sub(r"\s+", " ", (s or "")).strip()
@@ -108,18 +144,26 @@ def absolute_url(base: str, href: str) -> str:
         return href
     return urljoin(base, href)
 
+BROWSER_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "nl-NL,nl;q=0.9,en;q=0.7",
+    "Cache-Control": "no-cache",
+    "Pragma": "no-cache",
+}
+
+def make_session() -> requests.Session:
+    s = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 502, 503, 504])
+    s.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry))
+    s.headers.update(BROWSER_HEADERS)
+    return s
+
+SESSION = make_session()
+
 def fetch(url: str, referer: str | None = None) -> str:
-    headers = {
-        "User-Agent": USER_AGENT,
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "nl-NL,nl;q=0.9,en;q=0.7",
-        "Cache-Control": "no-cache",
-        "Pragma": "no-cache",
-    }
-    if referer:
-        headers["Referer"] = referer
-
-    r = requests.get(url, headers=headers, timeout=TIMEOUT, allow_redirects=True, verify=False)
+    headers = {"Referer": referer} if referer else None
+    r = SESSION.get(url, headers=headers, timeout=TIMEOUT, allow_redirects=True, verify=False)
     r.raise_for_status()
     return r.text
 
@@ -127,9 +171,7 @@ def write_csv(path: str, rows: list[Row]) -> None:
     with open(path, "w", newline="", encoding="utf-8-sig") as f:
         w = csv.writer(f, delimiter=";", quoting=csv.QUOTE_MINIMAL)
         w.writerow(COLUMNS)
-        for r in rows:
-            d = asdict(r)
-            w.writerow([d.get(c, "") for c in COLUMNS])
+        w.writerows(map(ROW_FIELDS, rows))
 
 def load_prev_urls(path: str) -> set[str]:
     try:
@@ -139,17 +181,70 @@ def load_prev_urls(path: str) -> set[str]:
     except FileNotFoundError:
         return set()
 
-def load_json_cache(path: str) -> dict:
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data if isinstance(data, dict) else {}
-    except FileNotFoundError:
-        return {}
+def open_cache_db(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS geo(k TEXT PRIMARY KEY, lat REAL, lon REAL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS rev(k TEXT PRIMARY KEY, municipality TEXT)")
+        conn.execute("CREATE TABLE IF NOT EXISTS http(k TEXT PRIMARY KEY, body TEXT, fetched_at REAL)")
+        # geo.db is committed by CI; keep the response cache from growing without bound
+        conn.execute("DELETE FROM http WHERE fetched_at < ?", (time.time() - NOMINATIM_HTTP_CACHE_TTL_SEC,))
+    return conn
+
+def geo_get(conn: sqlite3.Connection, k: str) -> tuple[float, float] | None:
+    row = conn.execute("SELECT lat, lon FROM geo WHERE k = ?", (k,)).fetchone()
+    if row is None:
+        return None
+    latlon = normalize_latlon(row[0], row[1])
+    if latlon is None:
+        with conn:
+            conn.execute("DELETE FROM geo WHERE k = ?", (k,))
+    return latlon
+
+def geo_get_first(conn: sqlite3.Connection, keys: list[str]) -> tuple[float, float] | None:
+    """One query for all keys; returns the first valid hit in `keys` order."""
+    if not keys:
+        return None
+    placeholders = ",".join("?" * len(keys))
+    hits = {k: (lat, lon) for k, lat, lon in conn.execute(
+        f"SELECT k, lat, lon FROM geo WHERE k IN ({placeholders})", keys
+    )}
+    for k in keys:
+        if k not in hits:
+            continue
+        latlon = normalize_latlon(*hits[k])
+        if latlon:
+            return latlon
+        with conn:
+            conn.execute("DELETE FROM geo WHERE k = ?", (k,))
+    return None
+
+def geo_put(conn: sqlite3.Connection, keys: list[str], lat: float, lon: float) -> None:
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO geo(k, lat, lon) VALUES (?, ?, ?)",
+            [(k, lat, lon) for k in keys],
+        )
+
+def rev_get(conn: sqlite3.Connection, k: str) -> str | None:
+    row = conn.execute("SELECT municipality FROM rev WHERE k = ?", (k,)).fetchone()
+    return row[0] if row else None
+
+def rev_put(conn: sqlite3.Connection, k: str, municipality: str) -> None:
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO rev(k, municipality) VALUES (?, ?)", (k, municipality))
+
+def http_cache_get(conn: sqlite3.Connection, k: str, max_age_sec: float) -> str | None:
+    row = conn.execute("SELECT body, fetched_at FROM http WHERE k = ?", (k,)).fetchone()
+    if row is None or time.time() - row[1] > max_age_sec:
+        return None
+    return row[0]
 
-def save_json_cache(path: str, cache: dict) -> None:
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(cache, f, ensure_ascii=False, indent=2)
+def http_cache_put(conn: sqlite3.Connection, k: str, body: str) -> None:
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO http(k, body, fetched_at) VALUES (?, ?, ?)", (k, body, time.time()))
 
 
 # --------------- DOMAIN FILTERS ---------------
@@ -521,6 +616,15 @@ def passes_immoweb_server_filters(detail_html: str) -> bool:
 
     return True
 
+def immoweb_row_passes_server_filters(row: Row) -> bool:
+    try:
+        detail_html = fetch(row.url, referer="https://www.immoweb.be/")
+    except Exception:
+        return False
+    finally:
+        time.sleep(SLEEP_SEC_BETWEEN_DETAIL_PAGES)
+    return passes_immoweb_server_filters(detail_html)
+
 def scrape_immoweb_search_page(search_url: str, html: str) -> list[Row]:
     soup = BeautifulSoup(html, "lxml")
     now = datetime.utcnow().isoformat(timespec="seconds")
@@ -532,7 +636,7 @@ def scrape_immoweb_search_page(search_url: str, html: str) -> list[Row]:
     anchors = soup.select('a[href*="/nl/advertentie/"], a[href*="/nl/zoekertje/"]')
     print(f"[IMMOWEB] anchors in HTML: {len(anchors)}")
 
-    results: dict[str, Row] = {}
+    results: list[Row] = []
     seen: set[str] = set()
 
     c_bad_url = c_no_cardnode = c_no_price = c_sponsored = c_no_pc = c_detail_fail = 0
@@ -627,7 +731,7 @@ def scrape_immoweb_search_page(search_url: str, html: str) -> list[Row]:
                 title = norm(card_text.split("€")[0])[:120] or "Immoweb listing"
 
         seen.add(url)
-        results.setdefault(url, Row(
+        results.append(Row(
             scraped_at=now,
             source=site_host,
             title=title,
@@ -639,20 +743,19 @@ def scrape_immoweb_search_page(search_url: str, html: str) -> list[Row]:
 
     print(f"[IMMOWEB] filtered: bad_url={c_bad_url}, no_cardnode={c_no_cardnode}, no_price={c_no_price}, sponsored={c_sponsored}, no_pc/detail_fail={c_no_pc}/{c_detail_fail}, detail_used_for_price={c_detail_used_for_price}")
 
+    candidates = [row for row in results if not is_sponsored_text(row.title + " " + row.location_text)]
+
     clean_rows = []
-    for row in results.values():
-        if is_sponsored_text(row.title + " " + row.location_text):
-            continue
-        try:
-            detail_html = fetch(row.url, referer="https://www.immoweb.be/")
-            if not passes_immoweb_server_filters(detail_html):
-                continue
-        except Exception:
-            continue
-        clean_rows.append(row)
-        time.sleep(0.3)
-        if len(clean_rows) >= 30:
-            break
+    # Every candidate is on immoweb.be, so the pool size is the per-host cap. Keeping it that small
+    # also bounds the overshoot: after the 30th pass only the in-flight fetches still complete.
+    with ThreadPoolExecutor(max_workers=DETAIL_MAX_PER_HOST) as pool:
+        # map() keeps search-result order, so "first 30" stays the same as in the serial version
+        for row, ok in zip(candidates, pool.map(immoweb_row_passes_server_filters, candidates)):
+            if ok:
+                clean_rows.append(row)
+            if len(clean_rows) >= 30:
+                pool.shutdown(wait=False, cancel_futures=True)
+                break
 
     print(f"[IMMOWEB] keeping first {len(clean_rows)} homes (server-filters OK, max 30)")
     if len(clean_rows) < 30:
@@ -662,75 +765,94 @@ def scrape_immoweb_search_page(search_url: str, html: str) -> list[Row]:
 
 # --------------- SCRAPE SEARCH PAGE (generic) ---------------
 
-def scrape_search_page(search_url: str, html: str) -> list[Row]:
+SKIP_RE = re.compile(r"(?:mailto:|tel:|javascript:|privacy|cookie|contact|login|inloggen)")
+CARD_PRICE_RE = re.compile(r"€\s?[\d\.\,]+(?:\s*[a-z\.]+)?", re.IGNORECASE)
+TITLE_POSTCODE_RE = re.compile(r"\b(\d{4}\s*[A-Z]{2})\b")
+FUNDA_PLACE_RE = re.compile(r"funda\.nl/detail/koop/([^/]+)/")
+SINCE_RE = re.compile(
+    r"(\d+\s*(?:dagen?|uren?)\s*geleden|nieuw|vandaag|gisteren|\b\d{1,2}[-/]\d{1,2}[-/]\d{4}\b)",
+    re.IGNORECASE
+)
+
+A_SEL = CSSSelector("a[href]")
+LOCATION_SELS = [CSSSelector(sel) for sel in [
+    ".location", ".address", ".plaats", ".place",
+    "[class*=location]", "[data-test*=location]",
+    ".search-result__address", ".search-result__location",
+    "[class*='address']", ".listing__location",
+    ".object-header__address"
+]]
+
+def element_text(el) -> str:
+    return norm(" ".join(el.itertext()))
+
+def scrape_search_page(search_url: str, html: str) -> Iterator[Row]:
     site_host = urlparse(search_url).netloc.lower()
 
     if "immoweb.be" in site_host:
-        return scrape_immoweb_search_page(search_url, html)
+        yield from scrape_immoweb_search_page(search_url, html)
+        return
 
-    soup = BeautifulSoup(html, "lxml")
+    doc = lxml_html.fromstring(html)
     now = datetime.utcnow().isoformat(timespec="seconds")
-    results: dict[str, Row] = {}
+    seen: set[str] = set()
 
-    for a in soup.select("a[href]"):
+    for a in A_SEL(doc):
         href = a.get("href", "")
-        title = norm(a.get_text(" ", strip=True))
+        title = element_text(a)
         if not href or len(title) < 4:
             continue
 
         url = absolute_url(search_url, href)
         low = url.lower()
 
-        if any(x in low for x in ["mailto:", "tel:", "javascript:", "privacy", "cookie", "contact", "login", "inloggen"]):
+        if SKIP_RE.search(low):
             continue
 
         if not is_allowed_detail_url(site_host, low):
             continue
 
-        card = a.find_parent(["article", "li", "div"])
-        card_text = norm(card.get_text(" ", strip=True) if card else title)
+        if url in seen:
+            continue
+
+        parents = a.xpath("ancestor::*[self::article or self::li or self::div][1]")
+        card = parents[0] if parents else None
+        card_text = element_text(card) if card is not None else title
 
         if not keyword_ok(title + " " + card_text):
             continue
 
         price_text = ""
-        mp = re.search(r"€\s?[\d\.\,]+(?:\s*[a-z\.]+)?", card_text, re.IGNORECASE)
+        mp = CARD_PRICE_RE.search(card_text)
         if mp:
             price_text = norm(mp.group(0))
 
         location_text = ""
-        for sel in [
-            ".location", ".address", ".plaats", ".place",
-            "[class*=location]", "[data-test*=location]",
-            ".search-result__address", ".search-result__location",
-            "[class*='address']", ".listing__location",
-            ".object-header__address"
-        ]:
-            el = card.select_one(sel) if card else None
-            if el:
-                location_text = norm(el.get_text(" ", strip=True))
-                break
+        if card is not None:
+            for sel in LOCATION_SELS:
+                # CSSSelector matches descendant-or-self; the card itself is not a location node
+                found = [el for el in sel(card) if el is not card]
+                if found:
+                    location_text = element_text(found[0])
+                    break
 
         if not location_text:
-            mloc = re.search(r"\b(\d{4}\s*[A-Z]{2})\b", title)
+            mloc = TITLE_POSTCODE_RE.search(title)
             if mloc:
                 location_text = norm(mloc.group(1))
 
         if not location_text and "funda.nl" in site_host:
-            mloc = re.search(r"funda\.nl/detail/koop/([^/]+)/", url.lower())
+            mloc = FUNDA_PLACE_RE.search(low)
             if mloc:
                 location_text = norm(mloc.group(1).replace("-", " "))
 
         since_text = ""
-        ms = re.search(
-            r"(\d+\s*(?:dagen?|uren?)\s*geleden|nieuw|vandaag|gisteren|\b\d{1,2}[-/]\d{1,2}[-/]\d{4}\b)",
-            card_text,
-            re.IGNORECASE
-        )
+        ms = SINCE_RE.search(card_text)
         if ms:
             since_text = norm(ms.group(1))
 
-        results.setdefault(url, Row(
+        seen.add(url)
+        yield Row(
             scraped_at=now,
             source=site_host,
             title=title,
@@ -738,9 +860,7 @@ def scrape_search_page(search_url: str, html: str) -> list[Row]:
             location_text=location_text,
             since_text=since_text,
             url=url
-        ))
-
-    return list(results.values())
+        )
 
 
 # --------------- GEO ---------------
@@ -769,17 +889,17 @@ def extract_place_from_location_text(location_text: str) -> str:
     return norm(place)
 
 def extract_place_from_funda_url(url: str) -> str:
-    m = re.search(r"funda\.nl/detail/koop/([^/]+)/", url.lower())
+    m = FUNDA_PLACE_RE.search(url.lower())
     if not m:
         return ""
     return m.group(1).replace("-", " ")
 
 def extract_street_from_title(title: str) -> str:
-    pc = extract_postcode_any(title, "NL")
-    if not pc:
+    # Cut at the match itself: the normalized "6301 AA" may not occur verbatim in the title ("6301aa").
+    m = NL_POSTCODE_RE.search(title or "")
+    if not m:
         return ""
-    before = title.split(pc)[0]
-    return norm(before)
+    return norm(title[:m.start()])
 
 def guess_address_variants(row: Row, allow_generic: bool = True) -> list[str]:
     country = country_from_source(row.source)
@@ -817,140 +937,248 @@ def guess_address_variants(row: Row, allow_generic: bool = True) -> list[str]:
             out.append(v)
     return out
 
-def get_center_latlon(geocode) -> tuple[float, float]:
-    loc = geocode(CENTER_NAME)
+class AsyncRateLimiter:
+    """Hands out one slot every `min_interval` seconds, shared by all callers."""
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+
+    async def wait(self) -> None:
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            # Re-check after sleeping: penalize() may have pushed the slot back meanwhile
+            while (delay := self._next_slot - loop.time()) > 0:
+                await asyncio.sleep(delay)
+            self._next_slot = loop.time() + self.min_interval
+
+    def penalize(self, delay: float) -> None:
+        """Push the next slot back for every caller, e.g. after a 429."""
+        self._next_slot = max(self._next_slot, asyncio.get_running_loop().time() + delay)
+
+def retry_after_seconds(value: str | None, default: float) -> float:
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+class AsyncNominatim:
+    """
+    Minimal Nominatim client on aiohttp. Forward and reverse lookups share one
+    rate limiter because Nominatim's usage policy is per client, not per endpoint.
+    200 /search responses are kept in the `http` table of the cache db, so repeat queries
+    (including ones that found nothing) skip both the request and the rate-limit slot.
+    /reverse is not HTTP-cached; the `rev` table already covers it.
+    """
+    def __init__(self, session: aiohttp.ClientSession, limiter: AsyncRateLimiter, conn: sqlite3.Connection):
+        self.session = session
+        self.limiter = limiter
+        self.conn = conn
+
+    async def _get(self, path: str, params: dict, http_cache: bool = True):
+        key = f"{path}?{urlencode(sorted(params.items()))}"
+        if http_cache:
+            cached = http_cache_get(self.conn, key, NOMINATIM_HTTP_CACHE_TTL_SEC)
+            if cached is not None:
+                return json.loads(cached)
+
+        for attempt in range(NOMINATIM_MAX_RETRIES):
+            await self.limiter.wait()
+            try:
+                async with self.session.get(f"{NOMINATIM_URL}/{path}", params=params) as resp:
+                    if resp.status == 429:
+                        # Back off the shared limiter so concurrent lookups stop too, not just this one
+                        self.limiter.penalize(retry_after_seconds(resp.headers.get("Retry-After"), 2 ** attempt))
+                        continue
+                    resp.raise_for_status()
+                    body = await resp.text()
+                    data = json.loads(body)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                return None
+            if http_cache:
+                http_cache_put(self.conn, key, body)
+            return data
+        return None
+
+    async def geocode(self, query: str) -> tuple[float | None, float | None] | None:
+        data = await self._get("search", {"format": "jsonv2", "q": query, "limit": 1})
+        if not data or not isinstance(data, list):
+            return None
+        return (_safe_float(data[0].get("lat")), _safe_float(data[0].get("lon")))
+
+    async def reverse(self, lat: float, lon: float) -> dict | None:
+        data = await self._get("reverse", {
+            "format": "jsonv2", "lat": lat, "lon": lon,
+            "zoom": 10, "addressdetails": 1, "accept-language": "nl",
+        }, http_cache=False)
+        if not isinstance(data, dict):
+            return None
+        return data.get("address") or {}
+
+async def get_center_latlon(nominatim: AsyncNominatim) -> tuple[float, float]:
+    loc = await nominatim.geocode(CENTER_NAME)
     if loc:
-        return (loc.latitude, loc.longitude)
+        latlon = normalize_latlon(loc[0], loc[1])
+        if latlon:
+            return latlon
     return CENTER_FALLBACK_LATLON
 
-def geocode_and_enrich_rows(rows: list[Row]) -> list[Row]:
-    geolocator = Nominatim(user_agent="bungalow_mapper/1.3")
-    geocode = RateLimiter(geolocator.geocode, min_delay_seconds=SLEEP_SEC_BETWEEN_GEOCODE)
-    reverse = RateLimiter(geolocator.reverse, min_delay_seconds=SLEEP_SEC_BETWEEN_GEOCODE)
-
-    geo_cache = load_json_cache(GEO_CACHE_JSON)
-    rev_cache = load_json_cache(REV_CACHE_JSON)
+# Funda blocks aggressive scrapers: detail pages stay strictly one at a time, as before the async geocoder.
+FUNDA_DETAIL_LOCK = threading.Lock()
 
-    center_latlon = get_center_latlon(geocode)
+def funda_detail_latlon_or_address(url: str) -> tuple[tuple[float, float] | None, str]:
+    with FUNDA_DETAIL_LOCK:
+        try:
+            detail_html = fetch(url, referer="https://www.funda.nl/")
+        finally:
+            time.sleep(SLEEP_SEC_BETWEEN_FUNDA_DETAIL)
+    lat, lon = funda_extract_latlon_from_detail(detail_html)
+    latlon = normalize_latlon(lat, lon)
+    if latlon:
+        return latlon, ""
+    return None, funda_extract_address_from_detail(detail_html)
+
+def haversine_km(center_latlon: tuple[float, float], lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    clat, clon = center_latlon
+    dlat = np.radians(lats - clat)
+    dlon = np.radians(lons - clon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(np.radians(clat)) * np.cos(np.radians(lats)) * np.sin(dlon / 2) ** 2
+    return 6371.0 * 2 * np.arcsin(np.sqrt(a))
+
+async def locate_row(r: Row, nominatim: AsyncNominatim, conn: sqlite3.Connection) -> tuple[float, float] | None:
+    is_funda = ("funda.nl" in (r.source or "").lower())
+    allow_generic = (not is_funda)
+
+    latlon = geo_get(conn, r.url)
+
+    if not latlon and is_funda:
+        try:
+            latlon, addr = await asyncio.to_thread(funda_detail_latlon_or_address, r.url)
 
-    enriched: list[Row] = []
-    for r in rows:
-        latlon: tuple[float, float] | None = None
-        is_funda = ("funda.nl" in (r.source or "").lower())
-        allow_generic = (not is_funda)
+            if latlon:
+                geo_put(conn, [r.url], latlon[0], latlon[1])
+            elif addr:
+                addr_full = norm(f"{addr}, Nederland")
 
-        if r.url in geo_cache:
-            latlon = normalize_latlon(geo_cache[r.url].get("lat"), geo_cache[r.url].get("lon"))
-            if latlon is None:
-                geo_cache.pop(r.url, None)
-                save_json_cache(GEO_CACHE_JSON, geo_cache)
+                latlon = geo_get(conn, addr_full)
 
-        if not latlon and is_funda:
-            try:
-                detail_html = fetch(r.url, referer="https://www.funda.nl/")
-
-                lat, lon = funda_extract_latlon_from_detail(detail_html)
-                latlon = normalize_latlon(lat, lon)
-
-                if latlon:
-                    geo_cache[r.url] = {"lat": latlon[0], "lon": latlon[1]}
-                    save_json_cache(GEO_CACHE_JSON, geo_cache)
-                else:
-                    addr = funda_extract_address_from_detail(detail_html)
-                    if addr:
-                        addr_full = norm(f"{addr}, Nederland")
-
-                        if addr_full in geo_cache:
-                            latlon = normalize_latlon(geo_cache[addr_full].get("lat"), geo_cache[addr_full].get("lon"))
-                            if latlon is None:
-                                geo_cache.pop(addr_full, None)
-                                save_json_cache(GEO_CACHE_JSON, geo_cache)
-
-                        if not latlon:
-                            loc = geocode(addr_full)
-                            if loc:
-                                latlon = normalize_latlon(loc.latitude, loc.longitude)
-                                if latlon:
-                                    geo_cache[r.url] = {"lat": latlon[0], "lon": latlon[1]}
-                                    geo_cache[addr_full] = {"lat": latlon[0], "lon": latlon[1]}
-                                    save_json_cache(GEO_CACHE_JSON, geo_cache)
-
-                time.sleep(SLEEP_SEC_BETWEEN_FUNDA_DETAIL)
-            except Exception:
-                pass
+                if not latlon:
+                    loc = await nominatim.geocode(addr_full)
+                    if loc:
+                        latlon = normalize_latlon(loc[0], loc[1])
+                        if latlon:
+                            geo_put(conn, [r.url, addr_full], latlon[0], latlon[1])
+        except Exception:
+            pass
 
-        if not latlon:
-            for addr in guess_address_variants(r, allow_generic=allow_generic):
-                if addr in geo_cache:
-                    latlon = normalize_latlon(geo_cache[addr].get("lat"), geo_cache[addr].get("lon"))
-                    if latlon:
-                        break
-                    geo_cache.pop(addr, None)
-                    save_json_cache(GEO_CACHE_JSON, geo_cache)
+    if not latlon:
+        # Variants are only built when the URL / Funda-detail paths missed
+        variants = guess_address_variants(r, allow_generic=allow_generic)
+        latlon = geo_get_first(conn, variants)
 
         if not latlon:
             found = None
-            for addr in guess_address_variants(r, allow_generic=allow_generic):
-                loc = geocode(addr)
+            for addr in variants:
+                loc = await nominatim.geocode(addr)
                 if loc:
-                    found = (loc.latitude, loc.longitude, addr)
+                    found = (loc[0], loc[1], addr)
                     break
 
             if not found:
                 print("[GEO FAIL]", r.source, "|", r.title, "|", r.url)
-                continue
+                return None
 
             latlon = normalize_latlon(found[0], found[1])
             if not latlon:
                 print("[BAD COORDS NOMINATIM]", r.source, "|", r.title, "|", r.url, "|", found[0], found[1], "|", found[2])
-                continue
+                return None
 
-            geo_cache[r.url] = {"lat": latlon[0], "lon": latlon[1]}
-            geo_cache[found[2]] = {"lat": latlon[0], "lon": latlon[1]}
-            save_json_cache(GEO_CACHE_JSON, geo_cache)
+            geo_put(conn, [r.url, found[2]], latlon[0], latlon[1])
 
-        lat, lon = latlon
-        latlon2 = normalize_latlon(lat, lon)
-        if not latlon2:
-            print("[BAD COORDS]", r.source, "|", r.title, "|", r.url, "|", lat, lon)
-            continue
-        lat, lon = latlon2
-
-        dist_km = float(geodesic(center_latlon, (lat, lon)).km)
-        if dist_km > RADIUS_KM:
-            continue
-
-        rev_key = f"{lat:.6f},{lon:.6f}"
+    lat, lon = latlon
+    latlon2 = normalize_latlon(lat, lon)
+    if not latlon2:
+        print("[BAD COORDS]", r.source, "|", r.title, "|", r.url, "|", lat, lon)
+        return None
+    return latlon2
+
+async def municipality_for(
+    rev_key: str,
+    lat: float,
+    lon: float,
+    nominatim: AsyncNominatim,
+    conn: sqlite3.Connection,
+) -> str:
+    municipality = rev_get(conn, rev_key)
+    if municipality is None:
         municipality = ""
-        if rev_key in rev_cache:
-            municipality = rev_cache[rev_key].get("municipality", "")
-        else:
-            try:
-                loc = reverse((lat, lon), language="nl", zoom=10, addressdetails=True)
-            except Exception:
-                loc = None
-
-            if loc and isinstance(loc.raw, dict):
-                addr = loc.raw.get("address", {}) or {}
-                municipality = (
-                    addr.get("municipality")
-                    or addr.get("city")
-                    or addr.get("town")
-                    or addr.get("village")
-                    or addr.get("county")
-                    or ""
-                )
-                rev_cache[rev_key] = {"municipality": municipality}
-                save_json_cache(REV_CACHE_JSON, rev_cache)
-
-        enriched.append(replace(
-            r,
-            municipality=municipality,
-            lat=lat,
-            lon=lon,
-            distance_km=round(dist_km, 1)
-        ))
+        addr = await nominatim.reverse(lat, lon)
+        if addr is not None:
+            municipality = (
+                addr.get("municipality")
+                or addr.get("city")
+                or addr.get("town")
+                or addr.get("village")
+                or addr.get("county")
+                or ""
+            )
+            rev_put(conn, rev_key, municipality)
+    return municipality
+
+async def geocode_and_enrich_rows_async(rows: list[Row]) -> list[Row]:
+    conn = open_cache_db(GEO_CACHE_DB)
+    limiter = AsyncRateLimiter(SLEEP_SEC_BETWEEN_GEOCODE)
+
+    async with aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit_per_host=1),
+        headers={"User-Agent": NOMINATIM_USER_AGENT},
+        timeout=aiohttp.ClientTimeout(total=TIMEOUT),
+    ) as session:
+        nominatim = AsyncNominatim(session, limiter, conn)
+        center_latlon = await get_center_latlon(nominatim)
+        latlons = await asyncio.gather(*(locate_row(r, nominatim, conn) for r in rows))
+
+        located = [(r, ll) for r, ll in zip(rows, latlons) if ll]
+        inside: list[tuple[Row, tuple[float, float], float]] = []
+        if located:
+            lats = np.array([ll[0] for _, ll in located])
+            lons = np.array([ll[1] for _, ll in located])
+            dists = haversine_km(center_latlon, lats, lons)
+            inside = [(r, ll, float(d)) for (r, ll), d in zip(located, dists) if d <= RADIUS_KM]
+
+        # One reverse lookup per country per 0.01° cell (~1 km); coarser cells straddle municipal
+        # borders (Valkenburg/Meerssen) and the NL/BE border (Maastricht/Lanaken).
+        buckets: dict[tuple[str, float, float], list[int]] = defaultdict(list)
+        for i, (r, ll, _) in enumerate(inside):
+            buckets[(country_from_source(r.source), round(ll[0], 2), round(ll[1], 2))].append(i)
+
+        lookups = []
+        for (country, blat, blon), idxs in buckets.items():
+            clat = sum(inside[i][1][0] for i in idxs) / len(idxs)
+            clon = sum(inside[i][1][1] for i in idxs) / len(idxs)
+            lookups.append(municipality_for(f"{country}:{blat:.2f},{blon:.2f}", clat, clon, nominatim, conn))
+        bucket_munis = await asyncio.gather(*lookups)
+
+        municipalities = [""] * len(inside)
+        for idxs, mun in zip(buckets.values(), bucket_munis):
+            for i in idxs:
+                municipalities[i] = mun
+
+    conn.close()
+    return [
+        replace(r, municipality=mun, lat=ll[0], lon=ll[1], distance_km=round(d, 1))
+        for (r, ll, d), mun in zip(inside, municipalities)
+    ]
 
+def geocode_and_enrich_rows(rows: list[Row]) -> list[Row]:
+    enriched = asyncio.run(geocode_and_enrich_rows_async(rows))
     print(f"[GEO] binnen {RADIUS_KM:.0f} km: {len(enriched)} / {len(rows)}")
     return enriched
 
@@ -1113,16 +1341,51 @@ def compute_municipality_centroids(rows: list[Row]) -> list[dict]:
 
 # --------------- MAP ---------------
 
+MARKER_CALLBACK_JS = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    marker.bindPopup(row[2], {maxWidth: 380});
+    if (row[3]) { marker.bindTooltip(row[3]); }
+    return marker;
+}
+"""
+
+def popup_html_for(r: Row) -> str:
+    mun = r.municipality or "Onbekende gemeente"
+    dist = f"{r.distance_km:.1f} km" if isinstance(r.distance_km, (int, float)) else ""
+    return (
+        f"<b>{r.title}</b><br>"
+        f"{r.price_text or ''}<br>"
+        f"<i>{mun}</i> — {dist}<br>"
+        f"{r.location_text or ''}<br>"
+        f"{r.since_text or ''}<br>"
+        f"<a href='{r.url}' target='_blank'>link</a>"
+    )
+
+def tooltip_for(r: Row) -> str:
+    mun = r.municipality or "Onbekende gemeente"
+    return " | ".join([mun, r.price_text or "", r.since_text or ""]).strip(" |")
+
 def write_map(rows: list[Row]) -> None:
     rows = [r for r in rows if r.lat is not None and r.lon is not None]
     if not rows:
         print("[WARN] Geen punten om te plotten.")
         return
 
-    avg_lat = sum(r.lat for r in rows) / len(rows)
-    avg_lon = sum(r.lon for r in rows) / len(rows)
+    # Center and bounds in one pass
+    slat = slon = 0.0
+    minlat = minlon = float("inf")
+    maxlat = maxlon = float("-inf")
+    for r in rows:
+        slat += r.lat
+        slon += r.lon
+        minlat = min(minlat, r.lat)
+        maxlat = max(maxlat, r.lat)
+        minlon = min(minlon, r.lon)
+        maxlon = max(maxlon, r.lon)
+    n = len(rows)
 
-    m = folium.Map(location=[avg_lat, avg_lon], zoom_start=9, control_scale=True, tiles=None)
+    m = folium.Map(location=[slat / n, slon / n], zoom_start=9, control_scale=True, tiles=None)
 
     # Base layers
     folium.TileLayer("OpenStreetMap", name="OpenStreetMap", control=True).add_to(m)
@@ -1139,8 +1402,10 @@ def write_map(rows: list[Row]) -> None:
     LocateControl(position="topleft").add_to(m)
     MousePosition(position="bottomleft", separator=" | ", num_digits=5).add_to(m)
 
-    # Listings cluster
-    listings_cluster = MarkerCluster(
+    # Listings cluster: markers are built client-side from plain [lat, lon, popup, tooltip] rows
+    FastMarkerCluster(
+        data=[[r.lat, r.lon, popup_html_for(r), tooltip_for(r)] for r in rows],
+        callback=MARKER_CALLBACK_JS,
         name="Listings",
         options={
             "spiderfyOnMaxZoom": True,
@@ -1151,30 +1416,8 @@ def write_map(rows: list[Row]) -> None:
         },
     ).add_to(m)
 
-    for r in rows:
-        mun = r.municipality or "Onbekende gemeente"
-        dist = f"{r.distance_km:.1f} km" if isinstance(r.distance_km, (int, float)) else ""
-
-        popup_html = (
-            f"<b>{r.title}</b><br>"
-            f"{r.price_text or ''}<br>"
-            f"<i>{mun}</i> — {dist}<br>"
-            f"{r.location_text or ''}<br>"
-            f"{r.since_text or ''}<br>"
-            f"<a href='{r.url}' target='_blank'>link</a>"
-        )
-        tip = " | ".join([mun, r.price_text or "", r.since_text or ""]).strip(" |")
-
-        folium.Marker(
-            location=[r.lat, r.lon],
-            popup=folium.Popup(popup_html, max_width=380),
-            tooltip=tip,
-        ).add_to(listings_cluster)
-
     # Fit bounds
-    bounds = [[min(r.lat for r in rows), min(r.lon for r in rows)],
-              [max(r.lat for r in rows), max(r.lon for r in rows)]]
-    m.fit_bounds(bounds, padding=(20, 20))
+    m.fit_bounds([[minlat, minlon], [maxlat, maxlon]], padding=(20, 20))
 
     folium.LayerControl(collapsed=False).add_to(m)
 
@@ -1194,52 +1437,77 @@ def write_map(rows: list[Row]) -> None:
 
 # --------------- MAIN ---------------
 
+def referer_for(url: str) -> str | None:
+    host = urlparse(url).netloc.lower()
+    if "funda.nl" in host:
+        return "https://www.funda.nl/"
+    if "immoweb.be" in host:
+        return "https://www.immoweb.be/"
+    return None
+
+def fetch_host_pages(urls: list[str]) -> list[str | BaseException]:
+    # Pages on one host go out one by one, SLEEP_SEC_BETWEEN_SITES apart (no sleep after the last)
+    pages: list[str | BaseException] = []
+    for i, url in enumerate(urls):
+        if i:
+            time.sleep(SLEEP_SEC_BETWEEN_SITES)
+        try:
+            pages.append(fetch(url, referer=referer_for(url)))
+        except Exception as e:
+            pages.append(e)
+    return pages
+
+def fetch_search_pages(urls: list[str]) -> list[str | BaseException]:
+    by_host: dict[str, list[str]] = defaultdict(list)
+    for url in urls:
+        by_host[urlparse(url).netloc.lower()].append(url)
+
+    # Hosts run in parallel, one thread each on SESSION, so keep-alive and 429/5xx retries apply
+    with ThreadPoolExecutor(max_workers=max(len(by_host), 1)) as pool:
+        results = list(pool.map(fetch_host_pages, by_host.values()))
+
+    pages: dict[str, str | BaseException] = {}
+    for host_urls, host_pages in zip(by_host.values(), results):
+        pages.update(zip(host_urls, host_pages))
+    return [pages[url] for url in urls]
+
 def run() -> None:
     if not SITES:
         print("Geen sites in SITES[]")
         return
 
     prev_urls = load_prev_urls(OUT_SNAPSHOT_CSV)
-    all_rows: list[Row] = []
+    seen: set[str] = set()
+    detail_rows: list[Row] = []
 
-    for i, search_url in enumerate(SITES):
+    search_urls: list[str] = []
+    for search_url in SITES:
         if not robots_allows(search_url):
             print(f"[SKIP robots] {search_url}")
             continue
+        search_urls.append(search_url)
 
-        try:
-            host = urlparse(search_url).netloc.lower()
-            if "funda.nl" in host:
-                referer = "https://www.funda.nl/"
-            elif "immoweb.be" in host:
-                referer = "https://www.immoweb.be/"
-            else:
-                referer = None
+    pages = fetch_search_pages(search_urls)
 
-            html = fetch(search_url, referer=referer)
-            rows = scrape_search_page(search_url, html)
-            print(f"[INFO] {urlparse(search_url).netloc}: {len(rows)} detail links")
+    for search_url, html in zip(search_urls, pages):
+        if isinstance(html, BaseException):
+            print(f"[ERROR] {search_url} -> {html}")
+            continue
+
+        try:
+            n_links = 0
+            for r in scrape_search_page(search_url, html):
+                n_links += 1
+                if r.url not in seen:
+                    seen.add(r.url)
+                    detail_rows.append(r)
+            print(f"[INFO] {urlparse(search_url).netloc}: {n_links} detail links")
         except Exception as e:
             print(f"[ERROR] {search_url} -> {e}")
-            rows = []
 
-        all_rows.extend(rows)
-
-        if i < len(SITES) - 1:
-            time.sleep(SLEEP_SEC_BETWEEN_SITES)
-
-    uniq: dict[str, Row] = {}
-    for r in all_rows:
-        uniq.setdefault(r.url, r)
-    detail_rows = list(uniq.values())
-
-    filtered_rows: list[Row] = []
-    for r in detail_rows:
-        if "funda.nl" in r.source or "immoweb.be" in r.source:
-            filtered_rows.append(r)
-            continue
-        time.sleep(SLEEP_SEC_BETWEEN_DETAIL_PAGES)
+    filtered_rows = [r for r in detail_rows if "funda.nl" in r.source or "immoweb.be" in r.source]
 
+    # Geocode fully before touching the snapshot, so a failed run leaves the previous one intact
     enriched_rows = geocode_and_enrich_rows(filtered_rows)
 
     write_csv(OUT_SNAPSHOT_CSV, enriched_rows)